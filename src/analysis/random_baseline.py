@@ -7,6 +7,7 @@ import matplotlib.pyplot as plt
 
 from src.data.datasets import load_features
 from src.strategies.sma_cross import sma_crossover_signals
+from src.strategies._posicao import posicao_do_sinal
 from src.backtest.engine import run_backtest_long_only
 from src.backtest.metrics import compute_metrics
 
@@ -58,7 +59,7 @@ def gerar_estrategia_aleatoria(df_dados: pd.DataFrame,prob_troca: float = 0.03,s
         else:
             sinais[i] = sinais[i - 1]      # mantém
     out["signal"] = sinais
-    out["position"] = pd.Series(out["signal"], index=out.index).shift(1).fillna(0).astype(int)
+    out["position"] = posicao_do_sinal(sinais)
 
     return out
 
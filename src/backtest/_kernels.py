@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import numpy as np
+from numba import njit
+
+# Kernel compilado do backtest long only. Recebe e devolve arrays crus (sem pandas),
+# então pode ser chamado milhares de vezes numa varredura de parâmetros pagando a
+# compilação uma vez só (cache=True grava o binário em __pycache__).
+# Sem fastmath: o loop é uma recorrência serial (equity[i] depende de equity[i-1]),
+# então não ganha nada com isso, e o nnan do fastmath quebraria o tratamento de NaN.
+@njit(cache=True)
+def _bt_long_only(pos, ret, cap, cost):
+    """
+    Uma passada O(n) com escalares locais:
+        net[i]    = pos[i] * ret[i] - |pos[i] - pos[i-1]| * cost
+        equity[i] = cap * prod(1 + net[:i+1])
+    NaN em ret deixa net/equity NaN naquele candle sem contaminar o resto.
+    Retorna (equity, net, trades).
+    """
+    n = pos.shape[0]
+    equity = np.empty(n, dtype=np.float64)
+    net = np.empty(n, dtype=np.float64)
+
+    valor = cap
+    anterior = pos[0] if n > 0 else 0
+    trades = 0
+    for i in range(n):
+        atual = pos[i]
+        troca = abs(np.int64(atual) - np.int64(anterior))
+        anterior = atual
+        trades += troca
+
+        r = atual * ret[i] - troca * cost
+        net[i] = r
+        if np.isnan(r):
+            equity[i] = np.nan
+        else:
+            valor *= 1.0 + r
+            equity[i] = valor
+
+    return equity, net, trades
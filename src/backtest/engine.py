@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+import numpy as np
 import pandas as pd
+
+from src.backtest._kernels import _bt_long_only
 #
 @dataclass(frozen=True)
 class ResultadoBacktest:
@@ -10,6 +13,50 @@ class ResultadoBacktest:
     trades: int
     initial_capital: float
 
+def _preparar_arrays(
+    df: pd.DataFrame,
+    position_col: str,
+    return_col: str,
+) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Valida as colunas, aplica as garantias minimas no index e extrai
+    position (int8) e retorno (float64) como arrays crus.
+    """
+    for col in (position_col, return_col):
+        if col not in df.columns:
+            raise ValueError(f"Coluna obrigatória ausente: {col}")
+        
+    #garantias minimas, só pagam o custo (sort/filtro) quando o index realmente precisa
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    if df.index.has_duplicates:
+        df = df[~df.index.duplicated(keep="last")]
+
+    # arrays crus: todo o cálculo roda em NumPy, sem colunas intermediárias no DataFrame
+    pos = df[position_col].to_numpy(dtype=np.int8, copy=False)
+    ret = df[return_col].to_numpy(dtype=np.float64, copy=False)
+    return df, pos, ret
+
+def _trocas_de_posicao(pos: np.ndarray) -> np.ndarray:
+    """
+    Trocas de posição (0->1 ou 1->0); long only => position em {0, 1},
+    então |pos[i] - pos[i-1]| é só um XOR, feito numa passada em int8.
+    """
+    pos_change = np.empty_like(pos)
+    pos_change[:1] = 0
+    np.bitwise_xor(pos[1:], pos[:-1], out=pos_change[1:])
+    return pos_change
+
+def _curva_equity(net: np.ndarray, initial_capital: float) -> np.ndarray:
+    """
+    equity em log: exp(cumsum(log1p(net))) no lugar do cumprod serial, mais estável em horizontes longos.
+    NaN em ret (ex: primeiro candle) fica NaN sem contaminar o resto, como no cumprod do pandas.
+    """
+    nan_mask = np.isnan(net)
+    equity = initial_capital * np.exp(np.log1p(np.where(nan_mask, 0.0, net)).cumsum(axis=0))
+    equity[nan_mask] = np.nan
+    return equity
+
 def run_backtest_long_only(
     df: pd.DataFrame,
     initial_capital: float = 10_000.00,
@@ -27,40 +74,142 @@ def run_backtest_long_only(
     Assume execução no candle position já deve estar shiftado.
     """
 
-    for col in (position_col, return_col):
-        if col not in df.columns:
-            raise ValueError(f"Coluna obrigatória ausente: {col}")
-        
-    bt = df.copy()
-
-    #garantias minimas
-    bt = bt.sort_index()
-    bt = bt[~bt.index.duplicated(keep="last")]
-
-    # retorno bruto da estratégia (sem custo)
-    bt["strategy_ret_gross"] = bt[position_col] * bt[return_col]
+    df, pos, ret = _preparar_arrays(df, position_col, return_col)
 
     # detecta trocas de posição (0->1 ou 1->0)
-    bt["pos_change"] = bt[position_col].diff().abs().fillna(0).astype(int)
+    pos_change = _trocas_de_posicao(pos)
 
     cost_per_side = fee_rate + slippage
-    bt["cost"] = bt["pos_change"] * cost_per_side
 
-    # retorno líquido
-    bt["strategy_ret_net"] = bt["strategy_ret_gross"] - bt["cost"]
+    # retorno líquido = retorno bruto (sem custo) - custo nas trocas
+    net = pos * ret - pos_change * cost_per_side
 
-    # equity
-    bt["equity"] = initial_capital * (1.0 + bt["strategy_ret_net"]).cumprod()
+    equity = _curva_equity(net, initial_capital)
 
-    trades = int(bt["pos_change"].sum())
+    trades = int(pos_change.sum(dtype=np.int64))
 
     return ResultadoBacktest(
-        equity=bt["equity"],
-        returns=bt["strategy_ret_net"],
+        equity=pd.Series(equity, index=df.index, name="equity"),
+        returns=pd.Series(net, index=df.index, name="strategy_ret_net"),
         trades=trades,
         initial_capital=initial_capital,
     )
 
+def run_backtest_long_only_dual(
+    df: pd.DataFrame,
+    fees: list[tuple[float, float]] | tuple[tuple[float, float], ...] = ((0.0, 0.0), (0.001, 0.0002)),
+    initial_capital: float = 10_000.00,
+    position_col: str = "position",
+    return_col: str = "ret",
+) -> list[ResultadoBacktest]:
+    """
+    Roda o mesmo backtest de run_backtest_long_only para vários pares (fee_rate, slippage)
+    sobre o mesmo df (ex: sem custo e com custo). O retorno bruto (position * ret) e as trocas
+    de posição são calculados uma vez só; para cada par só muda o termo de custo e a equity.
+    Retorna um ResultadoBacktest por par, na mesma ordem de fees.
+    """
+    df, pos, ret = _preparar_arrays(df, position_col, return_col)
+
+    gross = pos * ret
+
+    pos_change = _trocas_de_posicao(pos)
+    trades = int(pos_change.sum(dtype=np.int64))
+
+    resultados = []
+    for fee_rate, slippage in fees:
+        net = gross - pos_change * (fee_rate + slippage)
+        equity = _curva_equity(net, initial_capital)
+        resultados.append(ResultadoBacktest(
+            equity=pd.Series(equity, index=df.index, name="equity"),
+            returns=pd.Series(net, index=df.index, name="strategy_ret_net"),
+            trades=trades,
+            initial_capital=initial_capital,
+        ))
+
+    return resultados
+
+def run_backtest_matrix(
+    ret: np.ndarray,
+    positions: np.ndarray,
+    cost_per_side: float = 0.0012,
+    capital: float = 10_000.00,
+) -> np.ndarray:
+    """
+    Versão em lote do backtest long only para K estratégias (ou ativos) de uma vez.
+        ret:       (T,)   retorno do ativo por candle
+        positions: (T, K) posições 0/1 (já shiftadas), uma coluna por estratégia
+    Retorna equities (T, K), com a mesma convenção de custo e de NaN de run_backtest_long_only.
+    """
+    ret = np.asarray(ret, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.int8)
+    if positions.ndim == 1:
+        positions = positions[:, None]
+    if positions.shape[0] != ret.shape[0]:
+        raise ValueError(f"positions tem {positions.shape[0]} linhas, ret tem {ret.shape[0]}.")
+
+    gross = positions * ret[:, None]
+
+    # os helpers trabalham ao longo do eixo 0 (tempo), então servem tanto para (T,) quanto para (T, K)
+    pos_change = _trocas_de_posicao(positions)
+
+    net = gross - pos_change * cost_per_side
+
+    return _curva_equity(net, capital)
+
+def run_backtest_arrays(
+    position: np.ndarray,
+    ret: np.ndarray,
+    index: pd.Index | None = None,
+    initial_capital: float = 10_000.00,
+    fee_rate: float = 0.001,
+    slippage: float = 0.0002,
+) -> ResultadoBacktest:
+    """
+    Backtest long only direto sobre arrays (position já shiftada, ret do ativo), com o kernel Numba.
+    Em varreduras o ret e o index são extraídos do DataFrame uma vez só e cada config só
+    gera o seu vetor de position. Sem ordenação/deduplicação: quem chama garante o index.
+    index=None usa um RangeIndex nas Series de saída.
+    """
+    pos = np.asarray(position, dtype=np.int8)
+    ret = np.asarray(ret, dtype=np.float64)
+    if pos.shape != ret.shape:
+        raise ValueError(f"position tem {pos.shape[0]} candles, ret tem {ret.shape[0]}.")
+    if index is None:
+        index = pd.RangeIndex(ret.shape[0])
+
+    equity, net, trades = _bt_long_only(pos, ret, float(initial_capital), fee_rate + slippage)
+
+    return ResultadoBacktest(
+        equity=pd.Series(equity, index=index, name="equity"),
+        returns=pd.Series(net, index=index, name="strategy_ret_net"),
+        trades=int(trades),
+        initial_capital=initial_capital,
+    )
+
+def run_backtest_long_only_jit(
+    df: pd.DataFrame,
+    initial_capital: float = 10_000.00,
+    position_col: str = "position",
+    return_col: str = "ret",
+    fee_rate: float = 0.001,
+    slippage: float = 0.0002,
+) -> ResultadoBacktest:
+    """
+    Mesmo backtest de run_backtest_long_only, mas rodando o kernel Numba
+    (_kernels._bt_long_only) numa única passada. Pensado para varreduras de
+    parâmetros, onde o overhead do pandas por chamada domina.
+    """
+    df, pos, ret = _preparar_arrays(df, position_col, return_col)
+
+    return run_backtest_arrays(
+        pos,
+        ret,
+        index=df.index,
+        initial_capital=initial_capital,
+        fee_rate=fee_rate,
+        slippage=slippage,
+    )
+
 if __name__ == "__main__":
     import pandas as pd
     from src.data.datasets import load_features
@@ -18,18 +18,24 @@ def shape_ratio(returns: pd.Series, periodos_por_ano: int = 8760) -> float:
     Shape (fr=0): mean(ret)/std(ret) * sqrt(periodos_por_ano)
     """
 
-    returns = returns.dropna().astype(float)
+    x = returns.to_numpy(dtype=np.float64)
+    x = x[~np.isnan(x)]
 
-    if len(returns)<2:
+    n = x.size
+    if n<2:
         return float("nan")
     
-    #para evitar divisão por zero
-    std = returns.std(ddof=1)
+    # soma e soma dos quadrados numa passada (np.dot), sem Series intermediárias
+    s = x.sum()
+    ss = np.dot(x, x)
+    mean = s / n
+    var = (ss - s * s / n) / (n - 1)
 
-    if std == 0 or np.isnan(std):
+    #para evitar divisão por zero
+    if var <= 0 or np.isnan(var):
         return float("nan")
     
-    return (returns.mean()/std) * np.sqrt(periodos_por_ano)
+    return (mean / np.sqrt(var)) * np.sqrt(periodos_por_ano)
 
 def max_drawdown(equity: pd.Series)-> tuple[float, pd.Timestamp | None, pd.Timestamp | None]:
     """"
@@ -39,25 +45,30 @@ def max_drawdown(equity: pd.Series)-> tuple[float, pd.Timestamp | None, pd.Times
     mdd e negativo (ex: -0.35 = -35%)
     """
 
-    equity_value = equity.dropna().astype(float)
-    if equity_value.empty:
+    eq = equity.to_numpy(dtype=np.float64)
+    # remove NaN no ndarray, guardando a posição original de cada ponto (sem criar Series com dropna)
+    posicoes = np.flatnonzero(~np.isnan(eq))
+    if posicoes.size < eq.size:
+        eq = eq[posicoes]
+    if eq.size == 0:
         return float("nan"), None, None
     
-    running_max = equity_value.cummax()
-
-    drawdon = equity_value / running_max - 1.0
+    # running max + drawdown numa passada só sobre o ndarray
+    running_max = np.maximum.accumulate(eq)
 
-    max_drawdown_value = drawdon.min()
+    drawdon = eq / running_max - 1.0
 
-    end = drawdon.idxmin() if not np.isnan(max_drawdown_value) else None
+    end_i = int(drawdon.argmin())
+    max_drawdown_value = drawdon[end_i]
 
-    if end is None:
+    if np.isnan(max_drawdown_value):
         return float("nan"), None, None
     
-    #start = ponto do pico antes do vale
+    #start = ponto do pico antes do vale (argmax posicional numa view do ndarray, sem slice por label)
+    start_i = int(eq[:end_i + 1].argmax())
 
-    start = equity_value.loc[:end].idxmax()
-    return float (max_drawdown_value), start, end
+    # posição -> timestamp só no fim, direto no index original
+    return float(max_drawdown_value), equity.index[posicoes[start_i]], equity.index[posicoes[end_i]]
 
 
 def cagr(equity: pd.Series, periodos_por_ano: int = 8760) -> float:
@@ -99,14 +110,13 @@ if __name__ == "__main__":
     # Demo: SMA vs Buy & Hold com seus módulos atuais
     from src.data.datasets import load_features
     from src.strategies.sma_cross import sma_crossover_signals
-    from src.backtest.engine import run_backtest_long_only
+    from src.backtest.engine import run_backtest_long_only_dual
 
     df = load_features("BTCUSDT", "1h")
     df_sig = sma_crossover_signals(df, 20, 100)
 
     # Estratégia
-    res_nocost = run_backtest_long_only(df_sig, initial_capital=10_000, fee_rate=0.0, slippage=0.0)
-    res_cost   = run_backtest_long_only(df_sig, initial_capital=10_000, fee_rate=0.001, slippage=0.0002)
+    res_nocost, res_cost = run_backtest_long_only_dual(df_sig, fees=[(0.0, 0.0), (0.001, 0.0002)], initial_capital=10_000)
 
     met_nocost = compute_metrics(res_nocost.equity, res_nocost.returns)
     met_cost   = compute_metrics(res_cost.equity, res_cost.returns)
@@ -1,16 +1,20 @@
 from __future__ import annotations
 from pathlib import Path
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
 from src.data.datasets import load_features
 from src.strategies.sma_cross import sma_crossover_signals
-from src.backtest.engine import run_backtest_long_only
+from src.backtest.engine import run_backtest_long_only_dual
 from src.backtest.metrics import compute_metrics
 
 def drawdown_series(equity: pd.Series) -> pd.Series:
-    pico = equity.cummax()
-    return equity / pico - 1.0
+    # pico acumulado direto no ndarray, sem o dispatch de dtype do cummax; fmax ignora NaN
+    # (ex: primeiro candle da equity do backtest) do mesmo jeito que o cummax
+    valores = equity.to_numpy() if equity.dtype == np.float64 else equity.to_numpy(dtype=np.float64)
+    pico = np.fmax.accumulate(valores)
+    return pd.Series(valores / pico - 1.0, index=equity.index, copy=False)
 
 def main():
     symbol = "BTCUSDT"
@@ -21,9 +25,12 @@ def main():
     df_atualizado = load_features(symbol, tf)
     df_signal = sma_crossover_signals(df_atualizado, short_w, long_w)
 
-    #Estrategia sem custo e com cuwsto
-    res_nocost = run_backtest_long_only(df_signal, initial_capital = initial, fee_rate=0.0, slippage=0.0)
-    res_cost = run_backtest_long_only(df_signal, initial_capital=initial, fee_rate=0.001, slippage=0.0002)
+    #Estrategia sem custo e com cuwsto (uma passada só sobre position/ret para os dois cenários)
+    res_nocost, res_cost = run_backtest_long_only_dual(
+        df_signal,
+        fees=[(0.0, 0.0), (0.001, 0.0002)],
+        initial_capital=initial,
+    )
 
     met_nocost = compute_metrics(res_nocost.equity, res_nocost.returns)
     met_cost = compute_metrics(res_cost.equity, res_cost.returns)
@@ -68,25 +75,26 @@ def main():
     out_path.write_text(report_text, encoding="utf-8")
     print(f"\nRelatório salvo em: {out_path}")
 
-    # Plotando o gráfico Equity e Drawdown
-    fig1 = plt.figure()
-    ax1 = fig1.add_subplot(111)
-    res_nocost.equity.plot(ax=ax1)
-    res_cost.equity.plot(ax=ax1)
-    bh_equity.plot(ax=ax1)
+    # Plotando o gráfico Equity e Drawdown numa figura só, com uma chamada de plot por painel
+    curvas_equity = pd.DataFrame({
+        "SMA sem custo": res_nocost.equity,
+        "SMA com custo": res_cost.equity,
+        "Buy & Hold": bh_equity,
+    })
+    curvas_drawdown = pd.DataFrame({nome: drawdown_series(curva) for nome, curva in curvas_equity.items()})
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+    curvas_equity.plot(ax=ax1)
     ax1.set_title(f"Equity: SMA({short_w}/{long_w}) vs Buy & Hold ({symbol} {tf})")
-    ax1.legend(["SMA sem custo", "SMA com custo", "Buy & Hold"])
-    plt.show()
-
-    fig2 = plt.figure()
-    ax2 = fig2.add_subplot(111)
-    drawdown_series(res_nocost.equity).plot(ax=ax2)
-    drawdown_series(res_cost.equity).plot(ax=ax2)
-    drawdown_series(bh_equity).plot(ax=ax2)
+    curvas_drawdown.plot(ax=ax2)
     ax2.set_title(f"Drawdown: SMA({short_w}/{long_w}) vs Buy & Hold ({symbol} {tf})")
-    ax2.legend(["SMA sem custo", "SMA com custo", "Buy & Hold"])
-    plt.show()
+    fig.tight_layout()
 
+    # salva em arquivo em vez de plt.show(), que bloqueia e não funciona em ambiente sem tela
+    fig_path = Path("data/processed") / f"report_SMA{short_w}_{long_w}_{symbol}_{tf}.png"
+    fig.savefig(fig_path, dpi=100)
+    plt.close(fig)
+    print(f"Gráfico salvo em: {fig_path}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
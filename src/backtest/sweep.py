@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+from src.strategies.sma_cross import precompute_cumsum, sma_signal_matrix
+from src.backtest.engine import run_backtest_arrays
+from src.backtest.metrics import compute_metrics
+
+INITIAL_CAPITAL = 10_000
+
+# O df de features é enviado uma vez só para cada worker, no initializer, em vez de ser
+# serializado junto com cada tarefa; lá ele vira só os arrays que a varredura usa.
+# cumsums do close (soma e contagem de válidos), calculados uma vez por worker e reaproveitados por todos os pares (short, long)
+_CUMSUM_WORKER: tuple[np.ndarray, np.ndarray] | None = None
+# ret e index extraídos uma vez por worker: cada config só aloca o seu vetor de position
+_RET_WORKER: np.ndarray | None = None
+_INDEX_WORKER: pd.Index | None = None
+
+def _init_worker(df: pd.DataFrame) -> None:
+    global _CUMSUM_WORKER, _RET_WORKER, _INDEX_WORKER
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    if df.index.has_duplicates:
+        df = df[~df.index.duplicated(keep="last")]
+    _CUMSUM_WORKER = precompute_cumsum(df["close"].to_numpy())
+    _RET_WORKER = df["ret"].to_numpy(dtype=np.float64)
+    _INDEX_WORKER = df.index
+
+def _avaliar_lote(lote: list[tuple[int, int, float, float]]) -> list[dict]:
+    """
+    Roda um lote de (short_w, long_w, fee, slip) no worker: as posições de todos os pares
+    distintos do lote saem de uma vez (sma_signal_matrix) e cada tupla roda o seu backtest.
+    """
+    pares = list(dict.fromkeys((short_w, long_w) for short_w, long_w, _, _ in lote))
+    linha = {par: k for k, par in enumerate(pares)}
+    _, positions = sma_signal_matrix(_CUMSUM_WORKER, pares)
+
+    return [
+        _avaliar_params(short_w, long_w, fee, slip, positions[linha[(short_w, long_w)]])
+        for short_w, long_w, fee, slip in lote
+    ]
+
+def _avaliar_params(short_w: int, long_w: int, fee: float, slip: float, position: np.ndarray) -> dict:
+    """Roda o backtest com custo de SMA(short_w/long_w) no ret do worker."""
+    res = run_backtest_arrays(
+        position,
+        _RET_WORKER,
+        index=_INDEX_WORKER,
+        initial_capital=INITIAL_CAPITAL,
+        fee_rate=fee,
+        slippage=slip,
+    )
+    metrics = compute_metrics(res.equity, res.returns)
+
+    return {
+        "short": short_w,
+        "long": long_w,
+        "fee": fee,
+        "slippage": slip,
+        "sharpe": metrics.shape,
+        "cagr": metrics.cagr,
+        "mdd": metrics.max_drawdown,
+        "trades": res.trades,
+        "equity_final": float(res.equity.iloc[-1]),
+    }
+
+def run_sweep(
+    df: pd.DataFrame,
+    params_list: list[tuple[int, int, float, float]],
+    max_workers: int | None = None,
+) -> pd.DataFrame:
+    """
+    Varredura de parâmetros em paralelo (ProcessPoolExecutor).
+
+    params_list: lista de (short_w, long_w, fee, slip)
+    Cada worker recebe o df uma vez (initializer) e depois um lote contíguo de
+    tuplas de parâmetros (um lote por worker), avaliado de uma vez. Os resultados são
+    agregados conforme ficam prontos (as_completed), então a ordem das linhas não segue params_list.
+    Com um worker só (1 CPU ou 1 config) roda tudo no próprio processo, sem o custo de subir o pool.
+    """
+    if max_workers is None:
+        max_workers = max(1, min(len(params_list), os.cpu_count() or 1))
+
+    if max_workers == 1:
+        _init_worker(df)
+        return pd.DataFrame(_avaliar_lote(params_list))
+
+    tamanho_lote = max(1, -(-len(params_list) // max_workers))
+    lotes = [params_list[i:i + tamanho_lote] for i in range(0, len(params_list), tamanho_lote)]
+
+    resultados = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(df,)) as executor:
+        futures = [executor.submit(_avaliar_lote, lote) for lote in lotes]
+        for future in as_completed(futures):
+            resultados.extend(future.result())
+
+    return pd.DataFrame(resultados)
+
+if __name__ == "__main__":
+    from src.data.datasets import load_features
+
+    df = load_features("BTCUSDT", "1h")
+
+    params = [
+        (short_w, long_w, fee, slip)
+        for short_w in (10, 20, 30, 50)
+        for long_w in (100, 150, 200)
+        for fee, slip in ((0.0, 0.0), (0.001, 0.0002))
+    ]
+
+    table = run_sweep(df, params).sort_values("sharpe", ascending=False)
+    print(table.to_string(index=False))
@@ -1,8 +1,12 @@
 from __future__ import annotations
+import time
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from binance.client import Client
 
+from src.data.datasets import PARQUET_WRITE_KWARGS
+
 def download_klines(
     symbol: str, #exemplo: "BTCUSDT" para o par de negociação Bitcoin/USDT
     interval: str, #exemplo: Client.KLINE_INTERVAL_1HOUR para candles de 1 hora, ou Client.KLINE_INTERVAL_1DAY para candles diários porque a binance tem uma série de intervalos pré-definidos para os candles, e esses intervalos são representados por constantes na classe Client da biblioteca python-binance.
@@ -53,24 +57,31 @@ def download_klines(
     #taker_buy_quote_asset_volume: volume comprado por takers em termos da moeda de cotação
     #ignore: campo ignorado, geralmente é 0
 
-    df = pd.DataFrame(klines, columns=cols)
+    #em vez de pd.DataFrame(klines) (conversão linha a linha + inferência de dtype coluna por coluna),
+    #vira um único ndarray de objetos e cada coluna é convertida direto para o dtype certo.
+    arr = np.asarray(klines, dtype=object)
+    colunas = {c: arr[:, i] for i, c in enumerate(cols)}
     #tratamentos de dados para deixar o DataFrame mais limpo e fácil de trabalhar
 
     #as colunas de tempo (open_time e close_time) são originalmente timestamps em milissegundos,
-    #  então tem que ser convertidas para datetime.
-    df["open_time"] = pd.to_datetime(df["open_time"], unit = "ms", utc=True)
-    df["close_time"] = pd.to_datetime(df["close_time"], unit = "ms", utc=True)
+    #  então tem que ser convertidas para datetime (direto no ndarray int64, não numa Series).
+    colunas["open_time"] = pd.to_datetime(colunas["open_time"].astype(np.int64), unit = "ms", utc=True)
+    colunas["close_time"] = pd.to_datetime(colunas["close_time"].astype(np.int64), unit = "ms", utc=True)
     #essas colunas são originalmente strings, mas representam valores numéricos, então tem que ser convertidas para float.
+    #a binance sempre manda strings numéricas limpas, então o cast é direto, sem o caminho de coerção do pd.to_numeric.
     numeric_cols = ["open", "high", "low", "close", "volume",
                     "quote_asset_volume", "taker_buy_base_asset_volume",
                     "taker_buy_quote_asset_volume"]
     
     for c in numeric_cols:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
+        colunas[c] = colunas[c].astype(np.float64)
 
     #num_trades é um campo inteiro, mas pode conter valores inválidos,
     #  então usamos Int64 que é uma extensão do pandas para lidar com inteiros que podem conter NaN.
-    df["num_trades"] = pd.to_numeric(df["num_trades"], errors="coerce").astype("Int64")
+    colunas["num_trades"] = pd.array(pd.to_numeric(colunas["num_trades"], errors="coerce"), dtype="Int64")
+
+    #monta o DataFrame de uma vez a partir do dict de arrays já tipados (mesma ordem de cols)
+    df = pd.DataFrame(colunas)
 
 
     #indexando por open_time, removendo duplicações, ordenando e limpando
@@ -124,7 +135,7 @@ def load_existing_parquet(path: Path) -> pd.DataFrame:
 
     return df
 
-def merge_and_clean(old_df: pd.DataFrame, new_df: pd.Dataframe) -> pd.DataFrame:
+def merge_and_clean(old_df: pd.DataFrame, new_df: pd.DataFrame) -> pd.DataFrame:
     df = pd.concat([old_df, new_df], axis=0)
     df = df[~df.index.duplicated(keep="last")].sort_index()
     df = df.dropna(subset=["close"])
@@ -137,8 +148,12 @@ def update_dataset(
     tf_label: str,
     start_str_if_missing: str,
     end_str: str | None = None,
+    refresh_seconds: float = 0,
 )-> tuple[pd.DataFrame, Path]:
     """
+    Se o parquet existe e foi gravado há menos de refresh_seconds
+    - só carrega e devolve, sem chamar a API da Binance
+
     Se o parquet existe
     - carrega
     - pega o ultimo timestamp
@@ -155,6 +170,10 @@ def update_dataset(
     path = raw_parquet_path(symbol, tf_label)
 
     if path.exists():
+        #parquet recente: evita o round-trip HTTP com a Binance em execuções repetidas (ex: varreduras de backtest)
+        if refresh_seconds > 0 and (time.time() - path.stat().st_mtime) < refresh_seconds:
+            return load_existing_parquet(path), path
+
         old_df = load_existing_parquet(path)
         last_ts = old_df.index.max()
         step = interval_to_timedelta(interval)
@@ -168,12 +187,12 @@ def update_dataset(
             return old_df, path
         
         merged = merge_and_clean(old_df, new_df)
-        merged.to_parquet(path, engine="pyarrow")
+        merged.to_parquet(path, **PARQUET_WRITE_KWARGS)
         return merged, path
     
     #se não existe, baixa tudo a partir de start_str_if_missing e salva
     df = download_klines(symbol, interval, start_str_if_missing, end_str=end_str)
-    df.to_parquet(path, engine="pyarrow")
+    df.to_parquet(path, **PARQUET_WRITE_KWARGS)
 
     return df, path
 
@@ -186,7 +205,7 @@ def save_raw_parquet(df: pd.DataFrame, symbol: str, tf_label:str) -> Path:
     out_dir.mkdir(parents=True, exist_ok=True)
 
     out_path = out_dir / f"{symbol}_{tf_label}.parquet"
-    df.to_parquet(out_path, engine="pyarrow")
+    df.to_parquet(out_path, **PARQUET_WRITE_KWARGS)
 
     return out_path
 
@@ -208,6 +227,7 @@ if __name__ == "__main__":
         tf_label=tf_label,
         start_str_if_missing=start_str,
         end_str=None,
+        refresh_seconds=3600,
     )
 
     print(f" Salvo: {path} ({len(df):,} linhas)")
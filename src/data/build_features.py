@@ -4,6 +4,8 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
+from src.data.datasets import PARQUET_WRITE_KWARGS
+
 def load_raw(symbol: str, tf_label: str) -> pd.DataFrame:
     """"
     Carrega os dados brutos do parquet e retorna um DataFrame para o símbolo e tf_label especificados.
@@ -23,9 +25,12 @@ def load_raw(symbol: str, tf_label: str) -> pd.DataFrame:
     # garantidos para estar em ordem, ou se houver duplicados que possam estar fora de ordem.
     # A ordenação garante que as operações subsequentes, como merges e cálculos de indicadores,
     # sejam feitas corretamente com base na sequência temporal dos dados.
-    df = df.sort_index()
+    # Checagens baratas primeiro: o parquet normalmente já vem limpo, então só ordena/filtra quando precisa.
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
    
-    df = df[~df.index.duplicated(keep="last")] #Remove duplicados, mantendo o último registro (mais recente) para cada timestamp
+    if df.index.has_duplicates:
+        df = df[~df.index.duplicated(keep="last")] #Remove duplicados, mantendo o último registro (mais recente) para cada timestamp
     return df
 
 def add_basic_features(
@@ -37,21 +42,29 @@ def add_basic_features(
     if price_col not in df.columns: #Verifica se a coluna de preço especificada existe no DataFrame. Se não existir, lança um erro informando que a coluna não foi encontrada e listando as colunas disponíveis no DataFrame para ajudar o usuário a identificar o problema.
         raise ValueError(f"Coluna '{price_col}' não encontrada no DataFrame.")
     
-    out = df.copy()
+    precos = df[price_col]
 
     #retornos simples: (P_t - P_{t-1})-1, o que significa a variação percentual do preço de um período para o outro. É uma medida comum de retorno em finanças, que indica a porcentagem de ganho ou perda em relação ao preço anterior.
-    out["ret"] = out[price_col].pct_change() #Calcula o retorno simples usando a função pct_change() do pandas, que calcula a variação percentual entre o preço atual e o preço anterior. O resultado é uma nova coluna "ret" que contém os retornos simples para cada período.
+    ret = precos.pct_change() #Calcula o retorno simples usando a função pct_change() do pandas, que calcula a variação percentual entre o preço atual e o preço anterior. O resultado é uma nova coluna "ret" que contém os retornos simples para cada período.
 
     #log return: ln(P_t / P_{t-1}), o que significa a diferença entre o logaritmo do preço atual e o logaritmo do preço anterior. O log return é frequentemente usado em finanças porque tem propriedades matemáticas que facilitam a análise, como a aditividade ao longo do tempo (os log returns podem ser somados para obter o log return total sobre um período) e a simetria em relação a ganhos e perdas.
-    out["log_ret"] = np.log(out[price_col]).diff() #Calcula o log return usando a função diff() do pandas, que calcula a diferença entre o logaritmo do preço atual e o logaritmo do preço anterior. O resultado é uma nova coluna "log_ret" que contém os log returns para cada período.
+    log_ret = np.log(precos).diff() #Calcula o log return usando a função diff() do pandas, que calcula a diferença entre o logaritmo do preço atual e o logaritmo do preço anterior. O resultado é uma nova coluna "log_ret" que contém os log returns para cada período.
 
     #volatilidade rolling do log_ret (desvio padrão) calculada com base em uma janela móvel de z_window períodos. A volatilidade é uma medida de dispersão dos retornos e é frequentemente usada para avaliar o risco de um ativo. O desvio padrão é uma medida comum de volatilidade, e a janela móvel permite calcular a volatilidade ao longo do tempo, refletindo as mudanças na variabilidade dos retornos.
-    out[f"vol_{vol_window}"] = out["log_ret"].rolling(vol_window).std() #Calcula a volatilidade usando a função rolling() do pandas para criar uma janela móvel de z_window períodos e a função std() para calcular o desvio padrão dos log returns dentro dessa janela. O resultado é uma nova coluna "vol_{vol_window}" que contém a volatilidade calculada para cada período. 
+    vol = log_ret.rolling(vol_window).std() #Calcula a volatilidade usando a função rolling() do pandas para criar uma janela móvel de z_window períodos e a função std() para calcular o desvio padrão dos log returns dentro dessa janela. O resultado é uma nova coluna "vol_{vol_window}" que contém a volatilidade calculada para cada período. 
 
     #z-score do retorno simples (opcional) 
-    rolling_mean = out["ret"].rolling(z_window).mean() #Calcula a média móvel dos retornos simples usando a função rolling() do pandas para criar uma janela móvel de z_window períodos e a função mean() para calcular a média dos retornos dentro dessa janela. O resultado é uma nova série que contém a média móvel dos retornos para cada período.
-    rolling_std = out["ret"].rolling(z_window).std() #Calcula o desvio padrão móvel dos retornos simples usando a função rolling() do pandas para criar uma janela móvel de z_window períodos e a função std() para calcular o desvio padrão dos retornos dentro dessa janela. O resultado é uma nova série que contém o desvio padrão móvel dos retornos para cada período.
-    out[f"zret_{z_window}"] = (out["ret"]-rolling_mean)/rolling_std #Calcula o Z-Score dos retornos simples usando a fórmula (ret - média móvel) / desvio padrão móvel. O resultado é uma nova coluna "zret_{z_window}" que contém o Z-Score dos retornos para cada período. O Z-Score é uma medida de quão muitos desvios padrão um valor está acima ou abaixo da média, e pode ser usado para identificar retornos anormais ou extremos.
+    rolling_mean = ret.rolling(z_window).mean() #Calcula a média móvel dos retornos simples usando a função rolling() do pandas para criar uma janela móvel de z_window períodos e a função mean() para calcular a média dos retornos dentro dessa janela. O resultado é uma nova série que contém a média móvel dos retornos para cada período.
+    rolling_std = ret.rolling(z_window).std() #Calcula o desvio padrão móvel dos retornos simples usando a função rolling() do pandas para criar uma janela móvel de z_window períodos e a função std() para calcular o desvio padrão dos retornos dentro dessa janela. O resultado é uma nova série que contém o desvio padrão móvel dos retornos para cada período.
+    zret = (ret-rolling_mean)/rolling_std #Calcula o Z-Score dos retornos simples usando a fórmula (ret - média móvel) / desvio padrão móvel. O resultado é uma nova coluna "zret_{z_window}" que contém o Z-Score dos retornos para cada período. O Z-Score é uma medida de quão muitos desvios padrão um valor está acima ou abaixo da média, e pode ser usado para identificar retornos anormais ou extremos.
+
+    #Todas as colunas novas entram de uma vez com assign (um único DataFrame novo, sem df.copy() antes e sem fragmentar o BlockManager com inserções coluna a coluna).
+    out = df.assign(**{
+        "ret": ret,
+        "log_ret": log_ret,
+        f"vol_{vol_window}": vol,
+        f"zret_{z_window}": zret,
+    })
 
     return out
 
@@ -65,7 +78,7 @@ def save_processed(df: pd.DataFrame, symbol: str, tf_label: str) -> Path:
     out_dir.mkdir(parents=True, exist_ok=True)
 
     out_path = out_dir / f"{symbol}_{tf_label}_features.parquet"
-    df.to_parquet(out_path, engine="pyarrow")
+    df.to_parquet(out_path, **PARQUET_WRITE_KWARGS)
 
     return out_path
 
@@ -1,15 +1,62 @@
 from __future__ import annotations
 
+import functools
+import json
+import os
 from pathlib import Path
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
+
+# Configuração de escrita do parquet (build_features e binance_downloader): zstd comprime bem as
+# colunas OHLC (quase monotônicas), e row groups com estatísticas deixam o leitor pular páginas fora
+# do intervalo de tempo pedido (predicate pushdown). O row group é fixo em 8760 linhas para qualquer
+# timeframe: ~1 ano de candles de 1h, ~3 meses de 15m, ~24 anos de 1d.
+PARQUET_WRITE_KWARGS = dict(
+    engine="pyarrow",
+    compression="zstd",
+    compression_level=3,
+    row_group_size=8760,
+    use_dictionary=True,
+    write_statistics=True,
+)
 
 # Retorna o caminho do dataset de features para um símbolo e timeframe específico, seguindo a convenção de nomeação definida.
 def features_path(symbol: str, tf_label: str) -> Path:
     return Path("data/processed") / f"{symbol}_{tf_label}_features.parquet"
 
+# Leitura de parquet com cache, usada por load_features e por quality_checks.load_parquet (cada um só
+# acrescenta a sua validação). O cache é chaveado por caminho + mtime + colunas: chamadas repetidas no mesmo
+# processo (report, metrics, engine...) reaproveitam o DataFrame, e se o arquivo for regravado o mtime muda
+# e a leitura é refeita, então nunca serve dado velho.
+@functools.lru_cache(maxsize=16)
+def _ler_parquet_cache(path_str: str, mtime_ns: int, columns: tuple[str, ...] | None) -> pd.DataFrame:
+    # memory_map deixa o page cache do SO servir leituras repetidas do mesmo arquivo; use_threads decodifica
+    # os column chunks em paralelo; self_destruct libera os buffers do Arrow durante a conversão para pandas.
+    # columns faz a projeção no parquet (só lê as colunas pedidas); use_pandas_metadata traz o index junto.
+    # Sem types_mapper=pd.ArrowDtype: o resto do código usa NumPy (asi8, to_numpy, np.isnan) e espera dtypes NumPy.
+    table = pq.read_table(
+        path_str,
+        columns=list(columns) if columns is not None else None,
+        memory_map=True,
+        use_threads=True,
+        use_pandas_metadata=True,
+    )
+    return table.to_pandas(self_destruct=True)
+
+# columns: lê só essas colunas do parquet (None = todas); o index vem sempre.
+def read_parquet_cached(path: Path, columns: list[str] | None = None) -> pd.DataFrame:
+    path = Path(path)
+    chave_colunas = tuple(columns) if columns is not None else None
+    df = _ler_parquet_cache(str(path), path.stat().st_mtime_ns, chave_colunas)
+
+    # cópia rasa: com Copy-on-Write quem chamar pode alterar o DataFrame sem mexer no que está no cache
+    return df.copy(deep=False)
+
 # Carrega o dataset de features para um símbolo e timeframe específico, realizando
 #  verificações básicas para garantir que o dataset esteja no formato esperado.
-def load_features(symbol: str, tf_label: str) -> pd.DataFrame:
+# columns: lê só essas colunas do parquet (None = dataset completo).
+def load_features(symbol: str, tf_label: str, columns: list[str] | None = None) -> pd.DataFrame:
     path = features_path(symbol, tf_label)
     if not path.exists():
         raise FileNotFoundError(
@@ -17,28 +64,113 @@ def load_features(symbol: str, tf_label: str) -> pd.DataFrame:
             f"Rode: python -m src.data.build_features"
         )
     
-    df = pd.read_parquet(path)
+    df = read_parquet_cached(path, columns=columns)
 
     # Verificação basica para o backtest funcionar, o index precisa ser DatetimeIndex, ordenado e sem duplicatas.
     if not isinstance(df.index, pd.DatetimeIndex):
         raise ValueError("Dataset de features precisa estar com DatetimeIndex.")
     
-    df = df.sort_index()
-    df = df[~df.index.duplicated(keep="last")]
+    # Checagens baratas primeiro: depois do build_features o dataset já vem limpo, então só ordena/filtra quando precisa.
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    if df.index.has_duplicates:
+        df = df[~df.index.duplicated(keep="last")]
 
     # Verificação basica para o backtest funcionar, o dataset precisa conter as colunas: open, high, low, close, volume, ret e log_ret.
-    required = {"open", "high", "low", "close", "volume", "ret", "log_ret"}
+    # Com columns, as obrigatorias passam a ser só as colunas pedidas.
+    required = {"open", "high", "low", "close", "volume", "ret", "log_ret"} if columns is None else set(columns)
     missing = required - set(df.columns) # Verifica se tem as colunas obrigatorias, se faltar alguma, levanta um erro.
 
     if missing:
         raise ValueError(f"Faltando colunas obrigatorias no dataset: {missing}")
     
-    vol_cols = [c for c in df.columns if c.startswith("vol_")]
-    if not vol_cols:
-        raise ValueError("Nenhuma coluna de volatilidade encontrada (esperado algo como vol_24)")
+    if columns is None:
+        vol_cols = [c for c in df.columns if c.startswith("vol_")]
+        if not vol_cols:
+            raise ValueError("Nenhuma coluna de volatilidade encontrada (esperado algo como vol_24)")
 
     return df
 
+# Sidecars .npy ao lado do parquet de features com close, ret e o index (int64 do DatetimeIndex),
+# lidos com np.load(mmap_mode="r"): sem descompressão nem conversão Arrow -> pandas.
+# O json guarda o mtime do parquet de origem e é gravado por último, então sidecar
+# incompleto ou de um parquet antigo nunca é usado. Os arquivos são sempre trocados (os.replace),
+# nunca regravados no lugar: DataFrames já devolvidos continuam mapeados nos arquivos antigos.
+def _sidecar_paths(path: Path) -> dict[str, Path]:
+    base = path.with_suffix("")
+    return {
+        "close": base.with_suffix(".close.npy"),
+        "ret": base.with_suffix(".ret.npy"),
+        "index": base.with_suffix(".index.npy"),
+        "meta": base.with_suffix(".sidecar.json"),
+    }
+
+def _substituir_arquivo(destino: Path, escrever) -> None:
+    # grava num temporário ao lado do destino e troca de uma vez: o arquivo antigo (que pode estar
+    # em memmap) não é truncado, só deixa de ter nome e some quando o último mapeamento fecha
+    tmp = destino.with_name(f"{destino.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        escrever(f)
+    os.replace(tmp, destino)
+
+def _gravar_sidecars(df: pd.DataFrame, paths: dict[str, Path], mtime_ns: int) -> None:
+    arrays = {
+        "close": df["close"].to_numpy(dtype=np.float64),
+        "ret": df["ret"].to_numpy(dtype=np.float64),
+        "index": df.index.asi8,
+    }
+    for nome, arr in arrays.items():
+        _substituir_arquivo(paths[nome], lambda f, arr=arr: np.save(f, arr))
+
+    meta = {
+        "parquet_mtime_ns": mtime_ns,
+        "unit": df.index.unit,
+        "tz": str(df.index.tz) if df.index.tz is not None else None,
+        "name": df.index.name,
+    }
+    _substituir_arquivo(paths["meta"], lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+def _ler_meta_sidecar(paths: dict[str, Path], mtime_ns: int) -> dict | None:
+    if not all(p.exists() for p in paths.values()):
+        return None
+    meta = json.loads(paths["meta"].read_text(encoding="utf-8"))
+    if meta.get("parquet_mtime_ns") != mtime_ns:
+        return None
+    return meta
+
+# Carrega só close e ret (o que as varreduras de SMA usam) a partir dos sidecars em memmap.
+# Na primeira chamada (ou se o parquet mudou) lê o parquet via load_features, valida e grava os sidecars.
+# close fica em float64: as médias e os sinais saem iguais aos do caminho pelo parquet.
+def load_close_mmap(symbol: str, tf_label: str) -> pd.DataFrame:
+    path = features_path(symbol, tf_label)
+    if not path.exists():
+        raise FileNotFoundError(
+            f"Não achado o dataset de features: {path}\n"
+            f"Rode: python -m src.data.build_features"
+        )
+
+    mtime_ns = path.stat().st_mtime_ns
+    paths = _sidecar_paths(path)
+    meta = _ler_meta_sidecar(paths, mtime_ns)
+    if meta is None:
+        df = load_features(symbol, tf_label, columns=["close", "ret"])
+        _gravar_sidecars(df, paths, mtime_ns)
+        return df
+
+    index_int = np.load(paths["index"], mmap_mode="r")
+    index = pd.DatetimeIndex(index_int.view(f"M8[{meta['unit']}]"), name=meta["name"])
+    if meta["tz"] is not None:
+        index = index.tz_localize("UTC").tz_convert(meta["tz"])
+
+    return pd.DataFrame(
+        {
+            "close": np.load(paths["close"], mmap_mode="r"),
+            "ret": np.load(paths["ret"], mmap_mode="r"),
+        },
+        index=index,
+        copy=False,
+    )
+
 if __name__ == "__main__":
     df = load_features("BTCUSDT", "1h")
-    print(df.tail(5)[["close", "ret", "log_ret"] + [c for c in df.columns if c.startswith("vol_")][:1]])
\ No newline at end of file
+    print(df.tail(5)[["close", "ret", "log_ret"] + [c for c in df.columns if c.startswith("vol_")][:1]])
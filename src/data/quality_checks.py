@@ -1,36 +1,43 @@
 from __future__ import annotations
+import functools
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
-def load_parquet(path: Path) -> pd.DataFrame:
+from src.data.datasets import read_parquet_cached
+
+def load_parquet(path: Path, columns: list[str] | None = None) -> pd.DataFrame:
     """
     Carrega um arquivo parquet e retorna um DataFrame.
+    columns: lê só essas colunas (None = todas).
+    A leitura é a de datasets.read_parquet_cached (cache por caminho, mtime e colunas);
+    aqui só checa o DatetimeIndex, sem ordenar nem deduplicar, porque isso é o que o relatório avalia.
     """
-    dados_carregados_df = pd.read_parquet(path)
+    dados_carregados_df = read_parquet_cached(path, columns=columns)
     if not isinstance(dados_carregados_df.index, pd.DatetimeIndex):
         raise ValueError("O parquet não está com DatetimeIndex no index.")
     return dados_carregados_df
 
+# sufixo do tf_label -> argumento do pd.Timedelta
+_UNIT_MAP = {"m": "minutes", "h": "hours", "d": "days"}
+
+@functools.lru_cache(maxsize=32)
 def tf_label_to_timedelta(tf_label: str) -> pd.Timedelta:
     """
     tf_label exemplos: "1h", "15m", "1d", Porque o formato é mais simples e direto para os usuários, e é fácil de converter para Timedelta.
+    Poucos labels distintos são usados no projeto, então o resultado fica em cache (Timedelta é imutável).
     """
     tf_label = tf_label.strip().lower()
 
-    if tf_label.endswith("m"):
-        #Força a conversão para inteiro, garantindo que tf_label seja algo como "15m" e não "15.5m"
-        return pd.Timedelta(minutes=int(tf_label[:-1]))#Força a conversão para inteiro, garantindo que tf_label seja algo como "15m" e não "15.5m"
-    if tf_label.endswith("h"):
-        #Força a conversão para inteiro, garantindo que tf_label seja algo como "1h" e não "1.5h"
-        return pd.Timedelta(hours=int(tf_label[:-1]))
-    if tf_label.endswith("d"):
-        #Força a conversão para inteiro, garantindo que tf_label seja algo como "1d" e não "1.5d"
-        return pd.Timedelta(days=int(tf_label[:-1]))
-    
-    raise ValueError(f"tf_label invalido: {tf_label}. deve usar algo como '1h', '15m', '1d'.")
+    unidade = _UNIT_MAP.get(tf_label[-1:])
+    if unidade is None:
+        raise ValueError(f"tf_label invalido: {tf_label}. deve usar algo como '1h', '15m', '1d'.")
 
+    #Força a conversão para inteiro, garantindo que tf_label seja algo como "15m" e não "15.5m"
+    return pd.Timedelta(**{unidade: int(tf_label[:-1])})
 
-def quality_report(df: pd.DataFrame, tf_delta: pd.Timedelta) -> tuple[str, pd.Dataframe]:
+
+def quality_report(df: pd.DataFrame, tf_delta: pd.Timedelta) -> tuple[str, pd.DataFrame]:
     """
     """
     lines: list[str]=[]
@@ -42,16 +49,31 @@ def quality_report(df: pd.DataFrame, tf_delta: pd.Timedelta) -> tuple[str, pd.Da
     if not is_monotonic:
         lines.append(" -> AVISO: índice fora de ordem (vai ordenar no merge/bactest)")
     
-    #Lidando com duplicações pelo index
-    dupli_count = int(df.index.duplicated().sum()) #Conta o número de duplicações no index, convertendo para int para evitar problemas de tipo
+    #Lidando com duplicações pelo index, direto no int64 do DatetimeIndex
+    idx_int = df.index.asi8
+    if is_monotonic:
+        # ordenado: duplicado é sempre vizinho, basta comparar cada timestamp com o anterior
+        dupli_count = int(np.count_nonzero(idx_int[1:] == idx_int[:-1]))
+    else:
+        # fora de ordem: linhas - timestamps únicos (mesma contagem do index.duplicated().sum())
+        dupli_count = int(len(idx_int) - len(np.unique(idx_int)))
     lines.append(f"Duplicados no index: {dupli_count}")
 
-    #Nulos
-    nulls_total = int(df.isna().sum().sum())#Conta o número total de valores nulos no DataFrame, convertendo para int para evitar problemas de tipo
+    #Nulos: colunas float vão num bloco só para np.isnan; as demais (int, datetime, object...) usam isna
+    float_cols = [c for c, dt in df.dtypes.items() if isinstance(dt, np.dtype) and dt.kind == "f"]
+    nulls_por_coluna = dict.fromkeys(df.columns, 0)
+    if float_cols:
+        nan_float = np.isnan(df[float_cols].to_numpy(copy=False)).sum(axis=0)
+        nulls_por_coluna.update(zip(float_cols, nan_float.tolist()))
+    for col in df.columns.difference(float_cols, sort=False):
+        nulls_por_coluna[col] = int(df[col].isna().sum())
+    nulls_by_col = pd.Series(nulls_por_coluna, dtype=np.int64)
+
+    nulls_total = int(nulls_by_col.sum())
     lines.append(f"Total de valores nulos (todas colunas): {nulls_total}")
 
     #nulos por coluna (top 10)
-    nulls_by_col = df.isna().sum().sort_values(ascending=False)
+    nulls_by_col = nulls_by_col.sort_values(ascending=False)
     top_nulls = nulls_by_col[nulls_by_col > 0 ].head(10)
     #Se não houver colunas com nulos, top_nulls estará vazio,
     #  então vamos lidar com isso no relatório para evitar confusão. Se top_nulls estiver vazio,
@@ -67,43 +89,56 @@ def quality_report(df: pd.DataFrame, tf_delta: pd.Timedelta) -> tuple[str, pd.Da
     #  e isso pode indicar dados corrompidos ou erros de coleta. Se a coluna "close" estiver presente, vamos contar quantos 
     # registros têm valores inválidos e reportar isso.
     if "close" in df.columns:
-        invalid_close = int((df["close"]<=0).sum())
+        close = df["close"].to_numpy(copy=False)
+        invalid_close = int(np.count_nonzero(close <= 0))
         lines.append(f"Registros com close <= 0: {invalid_close}")
     else:
         lines.append("AVISO: coluna 'close' não encontrado (não dá pra checar close <=0).")
 
     # ---Gaps no tempo porque o index é DatetimeIndex, podemos calcular a diferença entre os timestamps consecutivos e contar quantos estão acima do tf_delta esperado. Isso indica onde temos buracos no tempo dos dados, o que pode ser problemático para análises e backtests.
-    df_sorted = df.sort_index()
-    diffs = df_sorted.index.to_series().diff()
-
-    gap_mask = diffs > tf_delta
+    # Daqui pra baixo só o index é usado: ordena só ele, e só quando está fora de ordem (sem copiar o DataFrame)
+    idx_sorted = df.index if is_monotonic else df.index.sort_values()
+    # diferenças direto no int64 do DatetimeIndex (np.subtract), sem Series de Timedelta do tamanho do index.
+    # O int64 está na unidade do index (ns, us, ms...), então o tf_delta é convertido para a mesma unidade.
+    unidade = idx_sorted.unit
+    idx_int = idx_sorted.asi8
+    diffs = np.empty_like(idx_int)
+    diffs[:1] = 0
+    np.subtract(idx_int[1:], idx_int[:-1], out=diffs[1:])
+
+    gap_mask = diffs > np.timedelta64(tf_delta, unidade).astype(np.int64)
     gap_count = int(gap_mask.sum())
 
     lines.append(f"Gaps (diff > {tf_delta}):{gap_count}")
 
-    #Construir tabela dos gaps (inicio, fim, tamamho) para os primeiros 10 gaps, para ajudar a identificar onde estão os buracos nos dados.
+    #Construir tabela dos gaps (inicio, fim, tamamho) só com as linhas que são gap, do maior para o menor,
+    #para ajudar a identificar onde estão os buracos nos dados. Só aqui os inteiros viram Timedelta.
+    gap_pos = np.flatnonzero(gap_mask)
+    gap_pos = gap_pos[np.argsort(-diffs[gap_pos], kind="stable")]
     gaps_df = pd.DataFrame({
-        "prev_time": df_sorted.index.to_series().shift(1), #O timestamp anterior, que é o início do gap
-        "curr_time": df_sorted.index.to_series(), #O timestamp atual, que é o fim do gap
-        "diff": diffs, #A diferença entre o timestamp atual e o anterior, que é o tamanho do gap
+        "prev_time": idx_sorted[gap_pos - 1], #O timestamp anterior, que é o início do gap
+        "curr_time": idx_sorted[gap_pos], #O timestamp atual, que é o fim do gap
+        "diff": pd.to_timedelta(diffs[gap_pos].view(f"m8[{unidade}]")), #A diferença entre o timestamp atual e o anterior, que é o tamanho do gap
     })
-    gaps_df = gaps_df[gap_mask].copy() #Filtra apenas os gaps usando a máscara
 
     if not gaps_df.empty:
-        # Top 15 maiores gaps
-        gaps_df = gaps_df.sort_values("diff", ascendign = False)
+        # Top 15 maiores gaps (a tabela já está ordenada por diff, do maior para o menor)
         lines.append("Maiores gaps (top 15):")
-        for _,row in gaps_df.head(15).iterrows():
-            lines.append(
-                f" - {row['prev_time']} -> {row['curr_time']} | gap={row['diff']}"
-            )
+        # formata as colunas inteiras de uma vez (astype(str)) em vez de montar uma Series por linha com iterrows
+        top_gaps = gaps_df.head(15)
+        prev_strs = top_gaps["prev_time"].astype(str).to_numpy()
+        curr_strs = top_gaps["curr_time"].astype(str).to_numpy()
+        diff_strs = top_gaps["diff"].astype(str).to_numpy()
+        lines.extend(
+            f" - {p} -> {c} | gap={d}" for p, c, d in zip(prev_strs, curr_strs, diff_strs)
+        )
     
     #Resumo geal do relatório com número de linhas, início e fim do index, para dar uma visão geral dos dados. Isso ajuda a entender o período coberto pelos dados e a quantidade de registros disponíveis.
     lines.append("")
     lines.append("Resumo:")
-    lines.append(f"Linhas: {len(df_sorted):,}")
-    lines.append(f"Início: {df_sorted.index.min()}")
-    lines.append(f"Fim: {df_sorted.index.max()}")
+    lines.append(f"Linhas: {len(idx_sorted):,}")
+    lines.append(f"Início: {idx_sorted.min()}")
+    lines.append(f"Fim: {idx_sorted.max()}")
 
 
     report_text = "\n".join(lines)
@@ -113,12 +148,22 @@ def save_report(text: str, out_path: Path) -> None:
     out_path.parent.mkdir(parents=True, exist_ok=True)
     out_path.write_text(text, encoding="utf-8")
 
-def run_quality_checks(symbol: str, tf_label: str) -> None:
+def run_quality_checks(
+    symbol: str,
+    tf_label: str,
+    columns: list[str] | None = None,
+    gaps_csv: bool = False,
+) -> None:
+    """
+    columns: restringe a leitura do parquet (ex: ["close"] para checar só preço, index e gaps).
+    Com None lê tudo, e a contagem de nulos cobre todas as colunas.
+    gaps_csv: além do parquet, salva a tabela de gaps também em csv.
+    """
     parquet_path = Path("data/raw") / f"{symbol}_{tf_label}.parquet"
     if not parquet_path.exists():
         raise FileNotFoundError(f"Não achei o parquet: {parquet_path}")
     
-    df = load_parquet(parquet_path)
+    df = load_parquet(parquet_path, columns=columns)
     tf_delta = tf_label_to_timedelta(tf_label)
 
     report_text, gaps_df = quality_report(df, tf_delta)
@@ -129,11 +174,17 @@ def run_quality_checks(symbol: str, tf_label: str) -> None:
     print(f"Relatório de qualidade salvo em: {out_path}")
     print(report_text)
 
-    #salva gaps em csv para análise posterior
+    #salva gaps em parquet para análise posterior (menor e mais rápido de reler que csv,
+    #e mantém os tipos datetime/timedelta das colunas)
     if not gaps_df.empty:
-        gaps_out = Path("data/processed") / f"gaps_{symbol}_{tf_label}.csv"
-        gaps_df.to_csv(gaps_out, index=False)
+        gaps_out = Path("data/processed") / f"gaps_{symbol}_{tf_label}.parquet"
+        gaps_df.to_parquet(gaps_out, engine="pyarrow", compression="zstd", index=False)
         print(f" Gaps salvos tambem em: {gaps_out}")
 
+        if gaps_csv:
+            gaps_out_csv = gaps_out.with_suffix(".csv")
+            gaps_df.to_csv(gaps_out_csv, index=False)
+            print(f" Gaps salvos tambem em: {gaps_out_csv}")
+
 if __name__ == "__main__":
     run_quality_checks("BTCUSDT", "1h")
\ No newline at end of file
@@ -1,10 +1,7 @@
 from __future__ import annotations
-import pandas as pd
 
-from src.data.datasets import load_features
-from src.strategies.sma_cross import sma_crossover_signals
-from src.backtest.engine import run_backtest_long_only
-from src.backtest.metrics import compute_metrics
+from src.data.datasets import load_close_mmap
+from src.backtest.sweep import run_sweep
 
 #configurações a serem testadas com o sma
 CONFIGS = [
@@ -16,32 +13,16 @@ CONFIGS = [
 ]
 
 def run_experiment(symbol="BTCUSDT", timeframe="1h"):
-    df_experiment = load_features(symbol, timeframe)
+    # o SMA só usa close e o backtest só usa ret: lê só essas duas colunas (sidecars .npy em memmap)
+    df_experiment = load_close_mmap(symbol, timeframe)
 
-    result=[]
-    for short, long in CONFIGS:
-        print(f"Rodando SMA({short}/{long})...")
+    # cada config é um backtest independente: roda todas em paralelo (um processo por config,
+    # limitado ao número de CPUs), com o df enviado uma vez só para cada worker
+    params = [(short, long, 0.001, 0.0002) for short, long in CONFIGS]
+    print(f"Rodando {len(params)} configs SMA em paralelo...")
+    result = run_sweep(df_experiment, params)
 
-        df_signal = sma_crossover_signals(df_experiment, short, long)
-
-        res = run_backtest_long_only(
-            df_signal,
-            initial_capital=10_000,
-            fee_rate=0.001,
-            slippage=0.0002,
-        )
-
-        metrics = compute_metrics(res.equity, res.returns)
-
-        result.append({
-            "short": short,
-            "long": long,
-            "sharpe": metrics.shape,
-            "cagr": metrics.cagr,
-            "mdd": metrics.max_drawdown,
-        })
-
-    df_resultados = pd.DataFrame(result).sort_values("sharpe", ascending=False)
+    df_resultados = result[["short", "long", "sharpe", "cagr", "mdd"]].sort_values("sharpe", ascending=False)
     return df_resultados
 
 if __name__ == "__main__":
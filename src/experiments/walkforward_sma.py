@@ -1,9 +1,11 @@
 from __future__ import annotations
+import numpy as np
 import pandas as pd
-from src.data.datasets import load_features
-from src.strategies.sma_cross import sma_crossover_signals
-from src.backtest.engine import run_backtest_long_only
+from src.data.datasets import load_close_mmap
+from src.strategies.sma_cross import precompute_cumsum, sma_signal_matrix
+from src.backtest.engine import run_backtest_arrays
 from src.backtest.metrics import compute_metrics
+from src.backtest.sweep import run_sweep
 
 CONFIGS = [
     (10, 50),
@@ -18,8 +20,16 @@ SLIP = 0.0002
 INITIAL = 10_000
 
 def eval_config(df: pd.DataFrame, short: int, long: int) -> dict:
-    df_signal = sma_crossover_signals(df, short, long)
-    result =  run_backtest_long_only(df_signal, initial_capital=INITIAL, fee_rate=FEE, slippage=SLIP)
+    # mesmo caminho de sinal/backtest do ranking no treino (run_sweep), para treino e teste serem comparáveis
+    _, positions = sma_signal_matrix(precompute_cumsum(df["close"].to_numpy()), [(short, long)])
+    result = run_backtest_arrays(
+        positions[0],
+        df["ret"].to_numpy(dtype=np.float64),
+        index=df.index,
+        initial_capital=INITIAL,
+        fee_rate=FEE,
+        slippage=SLIP,
+    )
     metrics = compute_metrics(result.equity, result.returns)
 
     return {
@@ -32,7 +42,8 @@ def eval_config(df: pd.DataFrame, short: int, long: int) -> dict:
 
 def main():
     symbol, tf = "BTCUSDT", "1H"
-    df_walkforward = load_features(symbol, tf)
+    # SMA usa close, backtest e buy & hold usam ret: lê só essas duas colunas (sidecars .npy em memmap)
+    df_walkforward = load_close_mmap(symbol, tf)
 
     #split temporal (sem embaralhar)
     split_date = df_walkforward.index.min() + (df_walkforward.index.max() - df_walkforward.index.min()) * 0.70
@@ -43,8 +54,9 @@ def main():
     print(f"Teste: {test.index.min()} -> {test.index.max()} (n={len(test)})\n")
 
     # escolhe melhor config NO TREINO
-    train_results = [eval_config(train, s, l) for s, l in CONFIGS]
-    train_df = pd.DataFrame(train_results).sort_values("sharpe", ascending=False)
+    # (as configs são independentes, então rodam em paralelo)
+    train_results = run_sweep(train, [(s, l, FEE, SLIP) for s, l in CONFIGS])
+    train_df = train_results[["short", "long", "sharpe", "cagr", "mdd"]].sort_values("sharpe", ascending=False)
 
     best = train_df.iloc[0].to_dict()
     best_s, best_l = int(best["short"]), int(best["long"])
@@ -63,11 +75,11 @@ def main():
 
     # 3) baseline no TESTE (buy & hold)
     df_test_sig = test.copy()
-    bh_ret = df_test_sig["ret"].fillna(0.0) if "ret" in df_test_sig.columns else None
-    if bh_ret is None:
-        # se você não tiver ret no features, dá pra recomputar aqui,
-        # mas no seu projeto já existe ret.
-        pass
+    if "ret" in df_test_sig.columns:
+        bh_ret = df_test_sig["ret"].fillna(0.0)
+    else:
+        # sem ret no features, recomputa a partir do close
+        bh_ret = df_test_sig["close"].pct_change().fillna(0.0)
 
     bh_equity = INITIAL * (1.0 + bh_ret.fillna(0.0)).cumprod()
     bh_met = compute_metrics(bh_equity, bh_ret.fillna(0.0))
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+def posicao_do_sinal(signal: pd.Series | np.ndarray) -> np.ndarray:
+    """
+    position = signal do candle anterior (0 no primeiro), mesmo resultado de
+    signal.shift(1).fillna(0).astype(...) mas sem a Series deslocada em float e a conversão de volta.
+    Mantém o dtype do sinal. Com várias séries empilhadas (K, T), desloca cada linha (eixo do tempo = último).
+    """
+    signal = np.asarray(signal)
+    position = np.empty_like(signal)
+    position[..., :1] = 0
+    position[..., 1:] = signal[..., :-1]
+    return position
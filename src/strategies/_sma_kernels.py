@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import numpy as np
+from numba import njit
+
+# Kernel do SMA crossover: as duas médias, o sinal e a posição (sinal do candle anterior)
+# saem de uma única passada sobre o preço, mantendo duas somas móveis em escalares locais.
+# Os arrays de saída são alocados por quem chama, já com o prefixo NaN/0.
+# Sem fastmath: o nnan do fastmath assume que não há NaN, e um close NaN faria a comparação
+# das médias dar True até o fim da série.
+@njit(cache=True)
+def sma_cross_kernel(close, sw, lw, out_s, out_l, out_sig, out_pos):
+    """
+    out_s[i]   = SMA(sw) quando os últimos sw closes são válidos, senão NaN
+    out_l[i]   = SMA(lw) quando os últimos lw closes são válidos, senão NaN
+    out_sig[i] = 1 se out_s[i] > out_l[i], senão 0 (0 enquanto a SMA longa não existe)
+    out_pos[i] = out_sig[i-1] (0 no primeiro candle)
+    Igual ao rolling(w, min_periods=w).mean(): NaN no close só entra na soma como "faltando"
+    (conta de válidos por janela), então as médias voltam depois de w candles sem NaN.
+    """
+    ss = 0.0
+    sl = 0.0
+    ns = 0
+    nl = 0
+    prev_sig = 0
+    for i in range(close.shape[0]):
+        x = close[i]
+        if not np.isnan(x):
+            ss += x
+            ns += 1
+            sl += x
+            nl += 1
+        if i >= sw:
+            y = close[i - sw]
+            if not np.isnan(y):
+                ss -= y
+                ns -= 1
+        if i >= lw:
+            y = close[i - lw]
+            if not np.isnan(y):
+                sl -= y
+                nl -= 1
+
+        if ns == sw:
+            out_s[i] = ss / sw
+
+        # a janela curta está dentro da longa: se a longa está completa, a curta também está
+        sig = 0
+        if nl == lw:
+            out_l[i] = sl / lw
+            if out_s[i] > out_l[i]:
+                sig = 1
+
+        out_sig[i] = sig
+        out_pos[i] = prev_sig
+        prev_sig = sig
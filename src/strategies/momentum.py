@@ -1,6 +1,8 @@
 from __future__ import annotations
 import pandas as pd
 
+from src.strategies._posicao import posicao_do_sinal
+
 SYMBOL="BTCUSDT"
 TF="1h"
 
@@ -16,7 +18,7 @@ def momentum_com_filtro_sma(dados_precos: pd.DataFrame, janela_lookback: int=24,
         (saida[coluna_preco] > saida[f"sma_{janela_sma}"])
     ).astype(int)
 
-    saida["position"] = saida["signal"].shift(1).fillna(0).astype(int)
+    saida["position"] = posicao_do_sinal(saida["signal"])
     return saida
 
 def momentum_com_filtro_volatilidade(dados_precos: pd.DataFrame, janela_momentum: int = 24, coluna_volatilidade: str = "vol_24", percentil_corte: float = 0.50, modo_filtro: str="low", coluna_preco: str = "close") -> pd.DataFrame:
@@ -56,7 +58,7 @@ def momentum_com_filtro_volatilidade(dados_precos: pd.DataFrame, janela_momentum
         dentro_do_regime
     ).astype(int)
     #Execucao shift para evitar olhar o futuro
-    dados["position"] = dados["signal"].shift(1).fillna(0).astype(int)
+    dados["position"] = posicao_do_sinal(dados["signal"])
     return dados
 
 def momentum_com_limiar_de_forca(dados_precos: pd.DataFrame, janela_lookback: int = 24, limiar_minimo:float=0.01, coluna_preco:str="close") ->pd.DataFrame:
@@ -76,7 +78,7 @@ def momentum_com_limiar_de_forca(dados_precos: pd.DataFrame, janela_lookback: in
     #O uso do limiar ajuda a filtrar oscilacoes pequenas e irrelevantes
     saida["signal"] = (saida[coluna_momentum] > limiar_minimo).astype(int)
     #aplicar o shift(1) para evitar lookhead 
-    saida["position"] = saida["signal"].shift(1).fillna(0).astype(int)
+    saida["position"] = posicao_do_sinal(saida["signal"])
     return saida
 
     
@@ -103,7 +105,7 @@ def sinais_momentum_absoluto(dados_precos: pd.DataFrame, janela_lookback: int =
     #Geração de sinais: 1 se subiu, 0 se caiu ou ficou estavel
     df_estrategia["signal"] = (df_estrategia[nome_coluna_mom]>0).astype(int)
     #Execução - A posicao e assumida no proximo candle (shift 1) para evitar viés de antecipaçao
-    df_estrategia["position"] = df_estrategia["signal"].shift(1).fillna(0).astype(int)
+    df_estrategia["position"] = posicao_do_sinal(df_estrategia["signal"])
 
     return df_estrategia
 
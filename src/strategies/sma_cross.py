@@ -1,6 +1,73 @@
 from __future__ import annotations
+import numpy as np
 import pandas as pd
 
+from src.strategies._sma_kernels import sma_cross_kernel
+from src.strategies._posicao import posicao_do_sinal
+
+# dtype das colunas de SMA no DataFrame de saída. As médias são acumuladas e comparadas em float64
+# (o sinal não muda); só o valor guardado é reduzido, o que corta pela metade os bytes dessas colunas.
+# Trocar para np.float64 se precisar das médias com precisão total.
+SMA_DTYPE = np.float32
+
+def precompute_cumsum(close: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Cumsums com zero na frente (len = N+1), feitos uma vez só por série e usados para qualquer
+    par de janelas em sma_signal_matrix:
+        soma:    cumsum do preço em float64, com NaN contando como 0
+        validos: cumsum de quantos closes não são NaN
+    Com os dois a SMA sai igual ao rolling(w, min_periods=w): NaN só na janela que contém NaN.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    nan_mask = np.isnan(close)
+
+    soma = np.empty(close.size + 1, dtype=np.float64)
+    soma[0] = 0.0
+    np.cumsum(np.where(nan_mask, 0.0, close), out=soma[1:])
+
+    validos = np.empty(close.size + 1, dtype=np.int64)
+    validos[0] = 0
+    np.cumsum(~nan_mask, out=validos[1:])
+    return soma, validos
+
+def _sma_de_cumsum(cumsums: tuple[np.ndarray, np.ndarray], window: int) -> np.ndarray:
+    """
+    SMA de tamanho window a partir dos cumsums de precompute_cumsum.
+    Retorna array de tamanho N com NaN nos primeiros window-1 candles e nas janelas com close NaN.
+    """
+    soma, validos = cumsums
+    n = soma.size - 1
+    sma = np.full(n, np.nan)
+    janela_completa = (validos[window:] - validos[:-window]) == window
+    sma[window - 1:] = np.where(janela_completa, (soma[window:] - soma[:-window]) / window, np.nan)
+    return sma
+
+def _montar_saida(
+        df: pd.DataFrame,
+        price_col: str,
+        colunas: dict[str, np.ndarray],
+        include_input: bool,
+) -> pd.DataFrame:
+    """
+    include_input=True: df de entrada + colunas novas. O assign (Copy-on-Write) não copia os dados de df,
+    só as colunas novas são alocadas.
+    include_input=False: DataFrame pequeno só com index, price_col e as colunas novas.
+    """
+    if include_input:
+        return df.assign(**colunas)
+    return pd.DataFrame({price_col: df[price_col], **colunas}, index=df.index)
+
+def _validar_janelas(short_window: int, long_window: int) -> None:
+    if short_window <= 0 or long_window <=0:
+        raise ValueError("As janelas precisam ser inteiros e > 0.")
+    if short_window >= long_window:
+        raise ValueError("short_window precisa ser menor que long_window.")
+
+def _validar_parametros(df: pd.DataFrame, short_window: int, long_window: int, price_col: str) -> None:
+    if price_col not in df.columns:
+        raise ValueError(f"Coluna de '{price_col}' não existe no dataframe.")
+    _validar_janelas(short_window, long_window)
+
 #porue usar SMA crossover?
 #Simplicidade: A estratégia é fácil de entender e implementar, tornando-a acessível para traders iniciantes.
 #Identificação de Tendências: O cruzamento de médias móveis pode ajudar a identificar mudanças na direção do mercado, sinalizando potenciais pontos de entrada e saída.
@@ -17,6 +84,7 @@ def sma_crossover_signals(
         short_window: int = 20,
         long_window: int = 100,
         price_col: str = "close",
+        include_input: bool = True,
 ) -> pd.DataFrame:
     """
     Gera sinais para estratégia SMA Crossover.
@@ -30,33 +98,67 @@ def sma_crossover_signals(
     sma_long: SMA de longo prazo
     signal
     position
+
+    include_input=False devolve só index, price_col e as 4 colunas acima (sem as demais colunas de df).
     """
-    if price_col not in df.columns:
-        raise ValueError(f"Coluna de '{price_col}' não existe no dataframe.")
-    
-    if short_window <= 0 or long_window <=0:
-        raise ValueError("As janelas precisam ser inteiros e > 0.")
-    if short_window >= long_window:
-        raise ValueError("short_window precisa ser menor que long_window.")
-    
-
-    out = df.copy()
-    sma_s=f"sma_{short_window}"
-    sma_l=f"sma_{long_window}"
-    # o uso de rolling com short_window e long_window garante que as médias móveis sejam calculadas corretamente,
-    # levando em consideração o número de períodos especificados para cada janela.
-    # O parâmetro min_periods é definido como o mesmo valor da janela para garantir que a
-    # média móvel só seja calculada quando houver dados suficientes disponíveis, evitando assim resultados distorcidos ou NaN nos primeiros períodos.
-    out[sma_s]=out[price_col].rolling(short_window, min_periods=short_window).mean()
-    out[sma_l]=out[price_col].rolling(long_window, min_periods=long_window).mean()
+    _validar_parametros(df, short_window, long_window, price_col)
 
+    # as duas médias, o sinal e a posição saem de uma passada só do kernel Numba (somas móveis).
+    # Os primeiros w-1 candles de cada média ficam NaN, igual ao rolling com min_periods=window, evitando
+    # resultados distorcidos nos primeiros períodos quando ainda não há dados suficientes.
     #sinal "teórico" no mesmo candle porque o sinal só é confirmado no fechamento do candle atual
-    out["signal"] = (out[sma_s] > out[sma_l]).astype(int)
-
     #posição que será usada no backtest (entra no candle seguinte porque o sinal só é confirmado no fechamento do candle atual)
-    out["position"] = out["signal"].shift(1).fillna(0).astype(int)
+    #signal/position só valem 0 ou 1, então ficam em int8 (1 byte por candle em vez de 8), que é o dtype que o engine lê
+    precos = df[price_col].to_numpy(dtype=np.float64, copy=False)
+    n = precos.size
+    sma_short = np.full(n, np.nan)
+    sma_long = np.full(n, np.nan)
+    signal = np.zeros(n, dtype=np.int8)
+    position = np.zeros(n, dtype=np.int8)
+    sma_cross_kernel(precos, short_window, long_window, sma_short, sma_long, signal, position)
+
+    # só monta o DataFrame no final
+    colunas = {
+        f"sma_{short_window}": sma_short.astype(SMA_DTYPE, copy=False),
+        f"sma_{long_window}": sma_long.astype(SMA_DTYPE, copy=False),
+        "signal": signal,
+        "position": position,
+    }
+    return _montar_saida(df, price_col, colunas, include_input)
+
+def sma_signal_matrix(
+        cumsums: tuple[np.ndarray, np.ndarray],
+        pares: list[tuple[int, int]],
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sinais de vários pares (short, long) a partir dos mesmos cumsums (precompute_cumsum), com as
+    mesmas regras de sma_crossover_signals. Cada janela distinta é calculada uma vez só
+    (ex: 200 usado por dois pares) e cada par custa só uma comparação.
+
+    Retorna (signal, position) em int8 com shape (K, T), uma linha por par na ordem de pares:
+    cada linha é contígua e vai direto para engine.run_backtest_arrays, sem cópia.
+    """
+    for short_window, long_window in pares:
+        _validar_janelas(short_window, long_window)
+
+    janelas = {w for par in pares for w in par}
+    smas = {w: _sma_de_cumsum(cumsums, w) for w in janelas}
+
+    n = cumsums[0].size - 1
+    signal = np.zeros((len(pares), n), dtype=np.int8)
+    for k, (short_window, long_window) in enumerate(pares):
+        # antes de long_window-1 a SMA longa é NaN e o sinal é 0: compara só a partir daí
+        # (NaN depois disso, de close NaN, compara como False e o sinal fica 0)
+        valid_from = long_window - 1
+        np.greater(
+            smas[short_window][valid_from:],
+            smas[long_window][valid_from:],
+            out=signal[k, valid_from:],
+            casting="unsafe",
+        )
 
-    return out
+    position = posicao_do_sinal(signal)
+    return signal, position
 
 if __name__ == "__main__":
     import pandas as pd
@@ -1,6 +1,8 @@
 from __future__ import annotations
 import pandas as pd
 
+from src.strategies._posicao import posicao_do_sinal
+
 def sinais_reversao_zscore(dados_precos: pd.DataFrame, janela_zscore: int = 48, limiar_compra: float = -2.0, limiar_venda: float = 2.0, coluna_preco: str = "close") -> pd.DataFrame:
     """
     Estratégia de Reversão à Média baseada em Z-Score (Long-Only).
@@ -39,7 +41,7 @@ def sinais_reversao_zscore(dados_precos: pd.DataFrame, janela_zscore: int = 48,
 
     df_analise["signal"] = sinais
     #shift(1) fundamental para evitar look-ahead bias (executar no próximo candle)
-    df_analise["position"] = df_analise["signal"].shift(1).fillna(0).astype(int)
+    df_analise["position"] = posicao_do_sinal(df_analise["signal"])
 
     return df_analise
 